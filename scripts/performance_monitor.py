@@ -5,59 +5,464 @@ This script provides a simple dashboard for monitoring the performance
 of the code block processing system in real-time.
 """
 
+import atexit
+import io
 import json
+import math
+import mmap
+import os
+import queue
+import re
+import signal
+import threading
 import time
+import shutil
 import subprocess
 import argparse
 import sys
+from collections import deque
 from datetime import datetime
 from pathlib import Path
+from xml.sax.saxutils import escape
 
 try:
-    import matplotlib.pyplot as plt
     import numpy as np
-    HAS_MATPLOTLIB = True
 except ImportError:
-    HAS_MATPLOTLIB = False
-    print("Warning: matplotlib not available, graphical features disabled")
+    sys.exit("performance_monitor.py requires numpy (pip install numpy)")
+
+try:
+    import orjson
+
+    def _dumps(obj, indent=False):
+        """Serialise obj to UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj, indent=False):
+        """Serialise obj to UTF-8 JSON bytes"""
+        if indent:
+            return json.dumps(obj, indent=2).encode()
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    _loads = json.loads
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+def _pyplot():
+    """Import matplotlib.pyplot on first use; None if matplotlib is missing"""
+    try:
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return None
+    return plt
+
+RUNNER_BIN = "performance-test-runner"
+
+# Separates the runner's text report from the metrics emitted by --emit-json
+METRICS_SENTINEL = "\n---METRICS---\n"
+
+# One alternative per metric of the runner's text report; group names are
+# the metric keys so a match maps straight onto the metrics dict
+_NUMBER = r"\d+(?:\.\d+)?"
+_METRIC_RE = re.compile(
+    rf"(?P<throughput>{_NUMBER})\s*ops/sec"
+    rf"|avg=(?P<latency_avg>{_NUMBER})ms"
+    rf"|p95=(?P<latency_p95>{_NUMBER})ms"
+    rf"|(?:initial|peak|final)=(?P<memory_usage>{_NUMBER})MB"
+    rf"|hit_ratio=(?P<cache_hit_ratio>{_NUMBER})%"
+    rf"|Success Rate:\s*(?P<success_rate>{_NUMBER})%"
+    r"|Passing Tests:\s*(?P<tests_passed>\d+)"
+    r"|Total Tests:\s*(?P<tests_total>\d+)"
+)
+# Metrics reported per test where the peak across tests is kept; the
+# remaining metrics keep the last reported value
+_MAX_METRICS = frozenset(('throughput', 'memory_usage'))
+# Converter per metric, float unless listed
+_METRIC_TYPES = {'tests_passed': int, 'tests_total': int}
+
+# History is appended as one JSON object per line, flushed after every
+# sample so --serve sees it, and fsynced every HISTORY_FSYNC_EVERY samples
+HISTORY_FSYNC_EVERY = 10
+# Newest samples kept in memory; older ones only live in the history file
+HISTORY_LIMIT = 4096
+# JSONL rows after which the history is folded into the Parquet archive
+HISTORY_COMPACT_THRESHOLD = 10_000
+# zstd level for archived history (Parquet codec or standalone .zst frames)
+ARCHIVE_ZSTD_LEVEL = 3
+# Rows per Parquet row group, so a tail read decodes at most a couple of groups
+ARCHIVE_ROW_GROUP_SIZE = HISTORY_LIMIT
+
+# Seconds a cancelled runner gets to exit after SIGTERM before SIGKILL
+TERMINATE_GRACE = 5
+
+# Numeric metrics mirrored into a columnar float64 buffer, in column order
+METRIC_COLUMNS = (
+    'throughput', 'latency_avg', 'latency_p95', 'memory_usage',
+    'cache_hit_ratio', 'success_rate', 'tests_passed'
+)
+COLUMN_INDEX = {name: i for i, name in enumerate(METRIC_COLUMNS)}
+
+if HAS_PYARROW:
+    # Typed columns of the compacted history archive
+    ARCHIVE_SCHEMA = pa.schema(
+        [('timestamp', pa.string()), ('ts_epoch', pa.float64())]
+        + [(name, pa.float64()) for name in METRIC_COLUMNS if name != 'tests_passed']
+        + [('tests_passed', pa.int64()), ('tests_total', pa.int64())]
+    )
+
+# Dashboard panels: (column, line style, title, y-axis label)
+PLOT_PANELS = (
+    ('throughput', 'b-o', 'Throughput (ops/sec)', 'Operations/sec'),
+    ('latency_avg', 'r-o', 'Average Latency (ms)', 'Milliseconds'),
+    ('memory_usage', 'g-o', 'Memory Usage (MB)', 'Megabytes'),
+    ('cache_hit_ratio', 'm-o', 'Cache Hit Ratio (%)', 'Percentage'),
+)
+# Saved dashboards are SVG: a 2x2 grid of panels, each a title strip above
+# a plot area of SVG_PANEL_WIDTH x SVG_PANEL_HEIGHT user units
+SVG_PANEL_WIDTH = 400
+SVG_PANEL_HEIGHT = 200
+SVG_TITLE_HEIGHT = 20
+# SVG stroke colour per matplotlib colour letter of PLOT_PANELS
+_SVG_COLOURS = {'b': 'blue', 'r': 'red', 'g': 'green', 'm': 'magenta'}
+
+# Wall clock read once at import and advanced with the monotonic clock, so
+# timestamps don't go through a full datetime.now() on every sample
+_WALL0 = time.time()
+_MONO0 = time.monotonic()
+
+def _wall_time():
+    """Return the current wall-clock time in seconds since the epoch"""
+    return _WALL0 + (time.monotonic() - _MONO0)
+
+def _now_iso(now=None):
+    """Return `now` (default: the current time) as a local ISO 8601 string"""
+    return datetime.fromtimestamp(_wall_time() if now is None else now).isoformat(timespec='seconds')
+
+def _sample_time(metrics):
+    """Return the local wall-clock time of a sample as datetime64[s]"""
+    epoch = metrics.get('ts_epoch')
+    if epoch is None:
+        # Samples recorded before ts_epoch existed only carry the ISO string
+        return np.datetime64(metrics['timestamp'], 's')
+    return np.datetime64(int(epoch) + time.localtime(epoch).tm_gmtoff, 's')
+
+def _svg_scale(values, extent):
+    """Map values linearly onto [0, extent]; a flat series sits mid-range"""
+    vmin, vmax = values.min(), values.max()
+    if vmax == vmin:
+        return np.full(len(values), extent / 2)
+    return (values - vmin) / (vmax - vmin) * extent
+
+def _write_svg(path, series):
+    """Write series ({title: (x, y, colour)}) as a 2x2 grid of SVG polylines"""
+    width = 2 * SVG_PANEL_WIDTH
+    height = 2 * (SVG_TITLE_HEIGHT + SVG_PANEL_HEIGHT)
+    buf = io.StringIO()
+    buf.write(f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+              f'font-family="sans-serif" font-size="12">\n')
+    for i, (title, (x, y, colour)) in enumerate(series.items()):
+        left = (i % 2) * SVG_PANEL_WIDTH
+        top = (i // 2) * (SVG_TITLE_HEIGHT + SVG_PANEL_HEIGHT)
+        buf.write(f'<g transform="translate({left},{top})">\n')
+        keep = np.isfinite(y)
+        x, y = x[keep].astype(np.float64), y[keep]
+        label = title if len(y) == 0 else f"{title} [{y.min():g} .. {y.max():g}]"
+        buf.write(f'<text x="{SVG_PANEL_WIDTH / 2:g}" y="{SVG_TITLE_HEIGHT - 5}" '
+                  f'text-anchor="middle">{escape(label)}</text>\n')
+        buf.write(f'<rect y="{SVG_TITLE_HEIGHT}" width="{SVG_PANEL_WIDTH}" '
+                  f'height="{SVG_PANEL_HEIGHT}" fill="none" stroke="lightgray"/>\n')
+        if len(y):
+            px = _svg_scale(x, SVG_PANEL_WIDTH)
+            # SVG y grows downwards, so the maximum goes to the top edge
+            py = SVG_TITLE_HEIGHT + SVG_PANEL_HEIGHT - _svg_scale(y, SVG_PANEL_HEIGHT)
+            points = " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(px, py))
+            buf.write(f'<polyline points="{points}" fill="none" stroke="{colour}"/>\n')
+        buf.write('</g>\n')
+    buf.write('</svg>\n')
+    
+    # Written whole under a temporary name so a viewer reloading the file
+    # never sees a half-written document
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(buf.getvalue())
+    os.replace(tmp, path)
+
+def _count_lines(path, block_size=1024 * 1024):
+    """Return the number of newline-terminated lines in a file"""
+    count = 0
+    with open(path, 'rb') as f:
+        while block := f.read(block_size):
+            count += block.count(b'\n')
+    return count
+
+def _tail_lines(path, count, block_size=64 * 1024):
+    """Return the last `count` non-empty lines of a file, reading it backwards"""
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        data = b''
+        # One newline more than needed guarantees the first kept line is whole
+        while end > 0 and data.count(b'\n') <= count:
+            start = max(0, end - block_size)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    lines = [line for line in data.splitlines() if line.strip()]
+    return lines[-count:]
+
+def _pump_lines(stream, lines):
+    """Forward each line read from stream to the lines queue, then None at EOF"""
+    try:
+        for line in stream:
+            lines.put(line)
+    except (OSError, ValueError):
+        pass
+    finally:
+        lines.put(None)
+
+def _decode_lines(lines):
+    """Decode JSONL lines, skipping any that are not valid JSON (e.g. torn writes)"""
+    records = []
+    for line in lines:
+        try:
+            records.append(_loads(line))
+        except ValueError:
+            print(f"Skipping malformed metrics line: {line[:80]!r}")
+    return records
+
+def _ends_with_newline(path):
+    """Return False if path is non-empty and its last byte is not a newline"""
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
 
 class PerformanceMonitor:
-    def __init__(self, results_dir="performance_results"):
+    def __init__(self, results_dir="performance_results", persistent=False):
         self.results_dir = Path(results_dir)
         self.results_dir.mkdir(exist_ok=True)
-        self.metrics_history = []
+        self.metrics_history = deque(maxlen=HISTORY_LIMIT)
+        self.history_file = self.results_dir / "metrics_history.jsonl"
+        # Parquet archive: one part file per compaction, oldest first by name
+        self.archive_dir = self.results_dir / "metrics_history.parquet.d"
+        # Fallback archive of concatenated zstd frames when pyarrow is missing
+        self.zstd_archive_file = self.results_dir / "metrics_history.jsonl.zst"
+        # "<offset> <rows>" line per frame of the zstd archive, oldest first
+        self.zstd_index_file = self.results_dir / "metrics_history.jsonl.zst.idx"
+        self._hist_fh = None
+        self._unsynced = 0
+        # Compaction closes and reopens the history file, so close it at exit
+        # from one registration instead of one per open
+        atexit.register(self.close)
+        # Rows currently in the JSONL file, i.e. not yet compacted
+        self._jsonl_rows = 0
+        # Columnar copy of metrics_history; rows beyond _rows are spare
+        # capacity and rows older than the last HISTORY_LIMIT are stale
+        self._arr = np.empty((0, len(METRIC_COLUMNS)), dtype=np.float64)
+        self._ts = np.empty(0, dtype='datetime64[s]')
+        self._rows = 0
+        # Set by SIGINT during continuous monitoring
+        self._stop = threading.Event()
+        # Resolved on the first test run so plot/trend modes never build
+        self.binary = None
+        # Keep one runner process alive across tests (continuous mode)
+        self.persistent = persistent
+        self._child = None
+        # Lines read from the persistent runner's stdout, None once it closes
+        self._child_lines = None
+        # One-shot runner process of the test in flight
+        self._proc = None
+        if persistent:
+            atexit.register(self._stop_worker)
+    
+    def _resolve_binary(self):
+        """Return the runner binary, building it once if it is not on PATH"""
+        if self.binary is None:
+            self.binary = shutil.which(RUNNER_BIN) or self._cargo_build_once()
+        return self.binary
+    
+    def _cargo_build_once(self):
+        """Build the runner in release mode and return the produced executable"""
+        print(f"Building {RUNNER_BIN} (release)...")
+        result = subprocess.run(
+            ["cargo", "build", "--release", "--bin", RUNNER_BIN, "--message-format=json"],
+            stdout=subprocess.PIPE,
+            text=True,
+            timeout=1800
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"cargo build failed with exit code {result.returncode}")
+        
+        executable = None
+        for line in result.stdout.splitlines():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if (message.get('reason') == 'compiler-artifact'
+                    and message.get('target', {}).get('name') == RUNNER_BIN
+                    and message.get('executable')):
+                executable = message['executable']
+        
+        if executable is None:
+            raise RuntimeError(f"cargo build did not report an executable for {RUNNER_BIN}")
+        return executable
+        
+    def _worker(self):
+        """Return the persistent runner process, (re)starting it if needed"""
+        if self._child is None or self._child.poll() is not None:
+            self._child = subprocess.Popen(
+                [self._resolve_binary(), "--daemon"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                bufsize=1
+            )
+            # Responses are read on a helper thread so waiting for one can
+            # time out portably (select() does not work on pipes on Windows)
+            self._child_lines = queue.Queue()
+            threading.Thread(
+                target=_pump_lines, args=(self._child.stdout, self._child_lines), daemon=True
+            ).start()
+        return self._child
+    
+    def _stop_worker(self):
+        """Shut down the persistent runner process"""
+        if self._child is not None:
+            self._terminate(self._child)
+            self._child = None
+    
+    @staticmethod
+    def _terminate(proc):
+        """Stop a runner process with SIGTERM, escalating to SIGKILL after the grace period"""
+        if proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(TERMINATE_GRACE)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    
+    def _request_stop(self, *_):
+        """SIGINT handler: stop monitoring and cancel the test in flight"""
+        self._stop.set()
+        # Only signal here: the interrupted main thread may hold the Popen's
+        # wait lock, so the grace wait and SIGKILL escalation happen once it
+        # regains control in run_performance_test / _run_in_worker
+        for proc in (self._proc, self._child):
+            if proc is not None:
+                proc.terminate()
+    
+    def _run_in_worker(self, quick, timeout):
+        """Run one test in the persistent runner and return its metrics"""
+        worker = self._worker()
+        worker.stdin.write(json.dumps({'cmd': 'run', 'quick': quick}) + '\n')
+        worker.stdin.flush()
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            # Wait in slices so a cancelled runner that ignores SIGTERM is
+            # escalated here instead of blocking until the test timeout
+            try:
+                line = self._child_lines.get(timeout=min(TERMINATE_GRACE, max(0.0, deadline - time.monotonic())))
+                break
+            except queue.Empty:
+                if self._stop.is_set() or time.monotonic() >= deadline:
+                    self._stop_worker()
+                    raise subprocess.TimeoutExpired(worker.args, timeout)
+        if line is None:
+            self._stop_worker()
+            raise RuntimeError("performance test worker exited unexpectedly")
+        
+        response = _loads(line)
+        if 'error' in response:
+            print(f"Performance test failed: {response['error']}")
+            return None
+        
+        metrics = self._empty_metrics()
+        metrics.update(response['metrics'])
+        # Same pass/fail contract as the runner's exit code
+        if metrics['tests_passed'] != metrics['tests_total']:
+            print(f"Performance test failed: {metrics['tests_passed']}/{metrics['tests_total']} tests passing")
+            return None
+        return metrics
         
     def run_performance_test(self, quick=False):
         """Run a performance test and return the results"""
+        timeout = 300 if quick else 1800  # 5 min for quick, 30 min for full
         try:
-            cmd = ["cargo", "run", "--release", "--bin", "performance-test-runner"]
+            if self.persistent:
+                return self._run_in_worker(quick, timeout)
+            
+            cmd = [self._resolve_binary(), "--emit-json"]
             if quick:
                 cmd.append("--quick-test")
             
-            result = subprocess.run(
+            proc = self._proc = subprocess.Popen(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=300 if quick else 1800  # 5 min for quick, 30 min for full
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
             )
+            deadline = time.monotonic() + timeout
+            try:
+                while True:
+                    # Same sliced wait as _run_in_worker
+                    try:
+                        stdout, stderr = proc.communicate(
+                            timeout=min(TERMINATE_GRACE, max(0.0, deadline - time.monotonic()))
+                        )
+                        break
+                    except subprocess.TimeoutExpired:
+                        if self._stop.is_set() or time.monotonic() >= deadline:
+                            raise
+            except (subprocess.TimeoutExpired, KeyboardInterrupt):
+                self._terminate(proc)
+                raise
+            finally:
+                self._proc = None
             
-            if result.returncode == 0:
-                return self.parse_performance_output(result.stdout)
+            if self._stop.is_set():
+                print("Performance test cancelled")
+                return None
+            if proc.returncode == 0:
+                return self.parse_performance_output(stdout)
             else:
-                print(f"Performance test failed: {result.stderr}")
+                print(f"Performance test failed: {stderr}")
                 return None
                 
         except subprocess.TimeoutExpired:
-            print("Performance test timed out")
+            if self._stop.is_set():
+                print("Performance test cancelled")
+            else:
+                print("Performance test timed out")
             return None
         except Exception as e:
-            print(f"Error running performance test: {e}")
+            if self._stop.is_set():
+                print("Performance test cancelled")
+            else:
+                print(f"Error running performance test: {e}")
             return None
     
-    def parse_performance_output(self, output):
-        """Parse performance test output and extract metrics"""
-        metrics = {
-            'timestamp': datetime.now().isoformat(),
+    def _empty_metrics(self):
+        """Return a metrics record with every field zeroed"""
+        now = _wall_time()
+        return {
+            'timestamp': _now_iso(now),
+            'ts_epoch': now,
             'throughput': 0.0,
             'latency_avg': 0.0,
             'latency_p95': 0.0,
@@ -67,148 +472,291 @@ class PerformanceMonitor:
             'tests_passed': 0,
             'tests_total': 0
         }
+    
+    def parse_performance_output(self, output):
+        """Parse performance test output and extract metrics"""
+        metrics = self._empty_metrics()
         
-        lines = output.split('\n')
+        _, sentinel, payload = output.rpartition(METRICS_SENTINEL)
+        if sentinel:
+            metrics.update(_loads(payload))
+            return metrics
         
-        for line in lines:
-            line = line.strip()
-            
-            # Extract throughput
-            if 'ops/sec' in line:
-                try:
-                    parts = line.split()
-                    for i, part in enumerate(parts):
-                        if 'ops/sec' in part and i > 0:
-                            metrics['throughput'] = max(metrics['throughput'], 
-                                                      float(parts[i-1]))
-                except (ValueError, IndexError):
-                    pass
-            
-            # Extract latency
-            if 'avg=' in line and 'ms' in line:
-                try:
-                    avg_part = line.split('avg=')[1].split(',')[0]
-                    if 'ms' in avg_part:
-                        metrics['latency_avg'] = float(avg_part.replace('ms', ''))
-                except (ValueError, IndexError):
-                    pass
-            
-            # Extract memory usage
-            if 'Memory:' in line and 'MB' in line:
-                try:
-                    parts = line.split()
-                    for part in parts:
-                        if 'MB' in part:
-                            metrics['memory_usage'] = max(metrics['memory_usage'],
-                                                        float(part.replace('MB', '')))
-                except (ValueError, IndexError):
-                    pass
-            
-            # Extract cache hit ratio
-            if 'Cache:' in line and '%' in line:
-                try:
-                    parts = line.split('hit_ratio=')[1].split('%')[0]
-                    metrics['cache_hit_ratio'] = float(parts)
-                except (ValueError, IndexError):
-                    pass
-            
-            # Extract success rate
-            if 'success' in line.lower() and '%' in line:
-                try:
-                    parts = line.split()
-                    for part in parts:
-                        if '%' in part and 'success' in line.lower():
-                            metrics['success_rate'] = float(part.replace('%', ''))
-                            break
-                except (ValueError, IndexError):
-                    pass
-            
-            # Extract test counts
-            if 'Passing Tests:' in line:
-                try:
-                    metrics['tests_passed'] = int(line.split(':')[1].strip())
-                except (ValueError, IndexError):
-                    pass
-            
-            if 'Total Tests:' in line:
-                try:
-                    metrics['tests_total'] = int(line.split(':')[1].strip())
-                except (ValueError, IndexError):
-                    pass
+        # Fall back to scraping the text report of older runner builds
+        peaks = {key: [] for key in _MAX_METRICS}
+        for match in _METRIC_RE.finditer(output):
+            key = match.lastgroup
+            value = _METRIC_TYPES.get(key, float)(match.group(key))
+            if key in peaks:
+                peaks[key].append(value)
+            else:
+                metrics[key] = value
+        for key, values in peaks.items():
+            metrics[key] = max(values, default=metrics[key])
         
         return metrics
     
+    def _columns(self):
+        """Return the rows of the columnar buffer matching metrics_history"""
+        return self._arr[max(0, self._rows - HISTORY_LIMIT):self._rows]
+    
+    def _timestamps(self):
+        """Return the sample timestamps matching _columns()"""
+        return self._ts[max(0, self._rows - HISTORY_LIMIT):self._rows]
+    
+    def _append_columns(self, metrics):
+        """Append one sample to the columnar buffer, doubling its capacity when full"""
+        if self._rows == len(self._arr) and self._rows >= 2 * HISTORY_LIMIT:
+            # At full capacity: move the live tail to the front instead of growing
+            keep = HISTORY_LIMIT - 1
+            self._arr[:keep] = self._arr[self._rows - keep:self._rows]
+            self._ts[:keep] = self._ts[self._rows - keep:self._rows]
+            self._rows = keep
+        elif self._rows == len(self._arr):
+            capacity = min(max(16, 2 * len(self._arr)), 2 * HISTORY_LIMIT)
+            grown = np.empty((capacity, len(METRIC_COLUMNS)), dtype=np.float64)
+            grown[:self._rows] = self._arr[:self._rows]
+            grown_ts = np.empty(len(grown), dtype='datetime64[s]')
+            grown_ts[:self._rows] = self._ts[:self._rows]
+            self._arr, self._ts = grown, grown_ts
+        self._arr[self._rows] = [metrics.get(name, 0.0) for name in METRIC_COLUMNS]
+        self._ts[self._rows] = _sample_time(metrics)
+        self._rows += 1
+    
+    def _rebuild_columns(self):
+        """Rebuild the columnar buffer from metrics_history"""
+        self._arr = np.array(
+            [[m.get(name, 0.0) for name in METRIC_COLUMNS] for m in self.metrics_history],
+            dtype=np.float64
+        ).reshape(-1, len(METRIC_COLUMNS))
+        self._ts = np.array([_sample_time(m) for m in self.metrics_history], dtype='datetime64[s]')
+        self._rows = len(self._arr)
+    
+    def _history_writer(self):
+        """Return the append handle of the history file, opening it on first use"""
+        if self._hist_fh is None:
+            torn = self.history_file.exists() and not _ends_with_newline(self.history_file)
+            self._hist_fh = open(self.history_file, 'ab')
+            if torn:
+                # Terminate a partial last record so the next one starts on its own line
+                self._hist_fh.write(b'\n')
+        return self._hist_fh
+    
+    def close(self):
+        """Flush buffered history and close the history file"""
+        if self._hist_fh is not None:
+            self._hist_fh.close()
+            self._hist_fh = None
+            self._unsynced = 0
+    
     def save_metrics(self, metrics):
         """Save metrics to file"""
         if metrics:
             self.metrics_history.append(metrics)
+            self._append_columns(metrics)
             
-            # Save to JSON file
-            metrics_file = self.results_dir / "metrics_history.json"
-            with open(metrics_file, 'w') as f:
-                json.dump(self.metrics_history, f, indent=2)
+            # Append to the JSONL history
+            history = self._history_writer()
+            history.write(_dumps(metrics) + b'\n')
+            history.flush()
+            self._unsynced += 1
+            self._jsonl_rows += 1
+            if self._unsynced >= HISTORY_FSYNC_EVERY:
+                os.fsync(history.fileno())
+                self._unsynced = 0
+            if (HAS_PYARROW or HAS_ZSTD) and self._jsonl_rows >= HISTORY_COMPACT_THRESHOLD:
+                self._compact_history()
             
             # Save latest metrics
-            latest_file = self.results_dir / "latest_metrics.json"
-            with open(latest_file, 'w') as f:
-                json.dump(metrics, f, indent=2)
+            self._atomic_write_json(self.results_dir / "latest_metrics.json", metrics)
+    
+    def _atomic_write_json(self, path, obj):
+        """Write obj as JSON so readers only ever see the old or the new file"""
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(_dumps(obj, indent=True))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    
+    def _compact_history(self):
+        """Fold the JSONL history into the archive and truncate it"""
+        self.close()
+        try:
+            if HAS_PYARROW:
+                self._compact_to_parquet()
+            else:
+                self._compact_to_zstd()
+            open(self.history_file, 'wb').close()
+            self._jsonl_rows = 0
+        except Exception as e:
+            print(f"Error compacting metrics history: {e}")
+    
+    def _archive_parts(self):
+        """Return the Parquet archive files, oldest first"""
+        if not self.archive_dir.exists():
+            return []
+        return sorted(self.archive_dir.glob("part-*.parquet"))
+    
+    def _compact_to_parquet(self):
+        """Write the JSONL rows to a new part file of the Parquet archive"""
+        with open(self.history_file, 'rb') as f:
+            records = _decode_lines(line for line in f if line.strip())
+        table = pa.Table.from_pylist(records, schema=ARCHIVE_SCHEMA)
+        
+        self.archive_dir.mkdir(exist_ok=True)
+        parts = sorted(self.archive_dir.glob("part-*.parquet"))
+        index = int(parts[-1].stem.split('-')[1]) + 1 if parts else 0
+        part = self.archive_dir / f"part-{index:06d}.parquet"
+        # Publish the part atomically before dropping the JSONL rows
+        tmp = part.with_suffix(part.suffix + ".tmp")
+        pq.write_table(table, tmp, compression='zstd', compression_level=ARCHIVE_ZSTD_LEVEL,
+                       row_group_size=ARCHIVE_ROW_GROUP_SIZE)
+        os.replace(tmp, part)
+    
+    def _load_parquet_tail(self, count):
+        """Return the newest `count` rows of the Parquet archive, oldest first"""
+        records = []
+        remaining = count
+        for part in reversed(self._archive_parts()):
+            if remaining <= 0:
+                break
+            parquet = pq.ParquetFile(part)
+            # Pick trailing row groups from the footer instead of decoding the file
+            groups = []
+            for i in reversed(range(parquet.metadata.num_row_groups)):
+                if remaining <= 0:
+                    break
+                groups.append(i)
+                remaining -= parquet.metadata.row_group(i).num_rows
+            records = parquet.read_row_groups(sorted(groups)).to_pylist() + records
+        return records[max(0, len(records) - count):]
+    
+    def _compact_to_zstd(self):
+        """Append the JSONL rows to the zstd archive as one more frame"""
+        rows = _count_lines(self.history_file)
+        with open(self.history_file, 'rb') as src, open(self.zstd_archive_file, 'ab') as dst:
+            offset = dst.seek(0, os.SEEK_END)
+            zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).copy_stream(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        # Indexed only once the frame is durable; an unindexed trailing frame
+        # is still read as part of the tail
+        with open(self.zstd_index_file, 'a') as index:
+            index.write(f"{offset} {rows}\n")
+    
+    def _zstd_tail_offset(self, count):
+        """Return the archive offset of the oldest frame needed for the last `count` rows"""
+        try:
+            with open(self.zstd_index_file) as index:
+                frames = [(int(offset), int(rows))
+                          for offset, rows in (line.split() for line in index if line.strip())]
+        except (OSError, ValueError):
+            # Missing or corrupt index (e.g. deleted, or a crash while writing it): read it all
+            return 0
+        
+        size = self.zstd_archive_file.stat().st_size
+        rows = 0
+        for offset, frame_rows in reversed(frames):
+            rows += frame_rows
+            if rows >= count:
+                return offset if offset <= size else 0
+        return 0
+    
+    def _load_archive_tail(self, count):
+        """Return the newest `count` archived records, oldest first"""
+        records = []
+        if count > 0 and HAS_PYARROW:
+            records = self._load_parquet_tail(count)
+        
+        # The zstd archive only holds rows compacted before the Parquet one
+        remaining = count - len(records)
+        if remaining > 0 and HAS_ZSTD and self.zstd_archive_file.exists():
+            with open(self.zstd_archive_file, 'rb') as fh:
+                # Skip the frames older than the requested tail
+                fh.seek(self._zstd_tail_offset(remaining))
+                with zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True) as reader:
+                    lines = deque((line for line in io.BufferedReader(reader) if line.strip()), maxlen=remaining)
+            records = _decode_lines(lines) + records
+        return records
     
     def load_metrics_history(self):
         """Load metrics history from file"""
-        metrics_file = self.results_dir / "metrics_history.json"
-        if metrics_file.exists():
-            try:
-                with open(metrics_file, 'r') as f:
-                    self.metrics_history = json.load(f)
-            except Exception as e:
-                print(f"Error loading metrics history: {e}")
-                self.metrics_history = []
+        legacy_file = self.results_dir / "metrics_history.json"
+        if not self.history_file.exists() and legacy_file.exists():
+            self._migrate_legacy_history(legacy_file)
+        
+        try:
+            lines = []
+            if self.history_file.exists():
+                lines = _tail_lines(self.history_file, HISTORY_LIMIT)
+                self._jsonl_rows = _count_lines(self.history_file)
+            # Older samples come from the archive when the JSONL alone is short
+            records = self._load_archive_tail(HISTORY_LIMIT - len(lines))
+            records.extend(_decode_lines(lines))
+            self.metrics_history = deque(records, maxlen=HISTORY_LIMIT)
+        except Exception as e:
+            print(f"Error loading metrics history: {e}")
+            self.metrics_history = deque(maxlen=HISTORY_LIMIT)
+        self._rebuild_columns()
     
-    def print_metrics(self, metrics):
-        """Print metrics in a formatted way"""
+    def _migrate_legacy_history(self, legacy_file):
+        """Convert a metrics_history.json array into the JSONL history"""
+        try:
+            with open(legacy_file, 'rb') as f:
+                legacy = _loads(f.read())
+            with open(self.history_file, 'wb') as f:
+                for metrics in legacy:
+                    f.write(_dumps(metrics) + b'\n')
+            print(f"Migrated {len(legacy)} entries from {legacy_file.name} to {self.history_file.name}")
+        except Exception as e:
+            print(f"Error migrating metrics history: {e}")
+    
+    def format_metrics(self, metrics):
+        """Return the metrics report as a single string"""
         if not metrics:
-            print("No metrics available")
-            return
+            return "No metrics available\n"
         
-        print("\n" + "="*50)
-        print(f"Performance Metrics - {metrics['timestamp']}")
-        print("="*50)
-        print(f"Throughput:        {metrics['throughput']:.1f} ops/sec")
-        print(f"Avg Latency:       {metrics['latency_avg']:.1f} ms")
-        print(f"P95 Latency:       {metrics['latency_p95']:.1f} ms")
-        print(f"Memory Usage:      {metrics['memory_usage']:.1f} MB")
-        print(f"Cache Hit Ratio:   {metrics['cache_hit_ratio']:.1f}%")
-        print(f"Success Rate:      {metrics['success_rate']:.1f}%")
-        print(f"Tests Passed:      {metrics['tests_passed']}/{metrics['tests_total']}")
-        print("="*50)
+        rule = "=" * 50
+        return (
+            f"\n{rule}\n"
+            f"Performance Metrics - {metrics['timestamp']}\n"
+            f"{rule}\n"
+            f"Throughput:        {metrics['throughput']:.1f} ops/sec\n"
+            f"Avg Latency:       {metrics['latency_avg']:.1f} ms\n"
+            f"P95 Latency:       {metrics['latency_p95']:.1f} ms\n"
+            f"Memory Usage:      {metrics['memory_usage']:.1f} MB\n"
+            f"Cache Hit Ratio:   {metrics['cache_hit_ratio']:.1f}%\n"
+            f"Success Rate:      {metrics['success_rate']:.1f}%\n"
+            f"Tests Passed:      {metrics['tests_passed']}/{metrics['tests_total']}\n"
+            f"{rule}\n"
+        )
     
-    def generate_trend_analysis(self):
-        """Generate trend analysis from metrics history"""
+    def print_metrics(self, metrics):
+        """Print metrics in a formatted way"""
+        sys.stdout.write(self.format_metrics(metrics))
+        sys.stdout.flush()
+    
+    def format_trend_analysis(self):
+        """Return the trend analysis of the metrics history as a single string"""
         if len(self.metrics_history) < 2:
-            print("Not enough data for trend analysis")
-            return
+            return "Not enough data for trend analysis\n"
         
-        print("\nTrend Analysis")
-        print("-" * 30)
+        lines = ["", "Trend Analysis", "-" * 30]
         
-        # Calculate trends for key metrics
-        recent = self.metrics_history[-5:]  # Last 5 measurements
-        older = self.metrics_history[-10:-5] if len(self.metrics_history) >= 10 else self.metrics_history[:-5]
+        # Compare the last 5 measurements with the 5 before them
+        columns = self._columns()
+        recent = columns[-5:]
+        older = columns[-10:-5]
         
-        if not older:
-            print("Not enough historical data")
-            return
+        if not len(older):
+            lines.append("Not enough historical data")
+            return "\n".join(lines) + "\n"
         
-        def calc_trend(metric_name):
-            recent_avg = sum(m[metric_name] for m in recent) / len(recent)
-            older_avg = sum(m[metric_name] for m in older) / len(older)
-            
-            if older_avg == 0:
-                return 0, "N/A"
-            
-            change = ((recent_avg - older_avg) / older_avg) * 100
-            trend = "↑" if change > 5 else "↓" if change < -5 else "→"
-            return change, trend
+        recent_avg = recent.mean(axis=0)
+        older_avg = older.mean(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes = np.where(older_avg != 0, (recent_avg - older_avg) / older_avg * 100, 0.0)
         
         metrics_to_analyze = [
             ('throughput', 'Throughput'),
@@ -219,93 +767,196 @@ class PerformanceMonitor:
         ]
         
         for metric_key, metric_name in metrics_to_analyze:
-            change, trend = calc_trend(metric_key)
-            print(f"{metric_name:15} {trend} {change:+6.1f}%")
+            i = COLUMN_INDEX[metric_key]
+            change = changes[i]
+            if older_avg[i] == 0:
+                trend = "N/A"
+            else:
+                trend = "↑" if change > 5 else "↓" if change < -5 else "→"
+            lines.append(f"{metric_name:15} {trend} {change:+6.1f}%")
+        return "\n".join(lines) + "\n"
+    
+    def generate_trend_analysis(self):
+        """Generate trend analysis from metrics history"""
+        sys.stdout.write(self.format_trend_analysis())
+        sys.stdout.flush()
+    
+    def _draw_panels(self, plt):
+        """Create the metrics figure and return it with the line of each panel"""
+        fig, axes = plt.subplots(2, 2, figsize=(12, 8), constrained_layout=True)
+        fig.suptitle('Performance Metrics Over Time')
+        
+        timestamps = self._timestamps()
+        columns = self._columns()
+        lines = []
+        for ax, (key, style, title, ylabel) in zip(axes.flat, PLOT_PANELS):
+            line, = ax.plot(timestamps, columns[:, COLUMN_INDEX[key]], style)
+            ax.set_title(title)
+            ax.set_ylabel(ylabel)
+            ax.grid(True)
+            ax.tick_params(axis='x', rotation=45)
+            lines.append(line)
+        return fig, lines
+    
+    def _save_svg(self, path):
+        """Write the dashboard panels for the current buffer to an SVG file"""
+        seconds = self._timestamps().astype('int64')
+        columns = self._columns()
+        _write_svg(path, {
+            title: (seconds, columns[:, COLUMN_INDEX[key]], _SVG_COLOURS[style[0]])
+            for key, style, title, _ in PLOT_PANELS
+        })
+    
+    def _update_panels(self, lines):
+        """Point the panel lines at the current buffer and rescale their axes"""
+        timestamps = self._timestamps()
+        columns = self._columns()
+        for line, (key, _, _, _) in zip(lines, PLOT_PANELS):
+            line.set_data(timestamps, columns[:, COLUMN_INDEX[key]])
+            line.axes.relim()
+            line.axes.autoscale_view()
     
     def plot_metrics(self, save_plot=False):
         """Plot metrics over time"""
-        if not HAS_MATPLOTLIB:
-            print("Matplotlib not available, cannot generate plots")
-            return
-        
         if len(self.metrics_history) < 2:
             print("Not enough data for plotting")
             return
         
-        # Extract data
-        timestamps = [datetime.fromisoformat(m['timestamp']) for m in self.metrics_history]
-        throughput = [m['throughput'] for m in self.metrics_history]
-        latency = [m['latency_avg'] for m in self.metrics_history]
-        memory = [m['memory_usage'] for m in self.metrics_history]
-        cache_hit = [m['cache_hit_ratio'] for m in self.metrics_history]
-        
-        # Create subplots
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 8))
-        fig.suptitle('Performance Metrics Over Time')
-        
-        # Throughput
-        ax1.plot(timestamps, throughput, 'b-o')
-        ax1.set_title('Throughput (ops/sec)')
-        ax1.set_ylabel('Operations/sec')
-        ax1.grid(True)
-        
-        # Latency
-        ax2.plot(timestamps, latency, 'r-o')
-        ax2.set_title('Average Latency (ms)')
-        ax2.set_ylabel('Milliseconds')
-        ax2.grid(True)
-        
-        # Memory Usage
-        ax3.plot(timestamps, memory, 'g-o')
-        ax3.set_title('Memory Usage (MB)')
-        ax3.set_ylabel('Megabytes')
-        ax3.grid(True)
-        
-        # Cache Hit Ratio
-        ax4.plot(timestamps, cache_hit, 'm-o')
-        ax4.set_title('Cache Hit Ratio (%)')
-        ax4.set_ylabel('Percentage')
-        ax4.grid(True)
+        if save_plot:
+            # Saved plots are written as SVG directly; matplotlib is only
+            # needed for the interactive window
+            plot_file = self.results_dir / f"performance_plot_{time.strftime('%Y%m%d_%H%M%S', time.localtime(_wall_time()))}.svg"
+            self._save_svg(plot_file)
+            print(f"Plot saved to: {plot_file}")
+            return
         
-        # Format x-axis
-        for ax in [ax1, ax2, ax3, ax4]:
-            ax.tick_params(axis='x', rotation=45)
+        plt = _pyplot()
+        if plt is None:
+            print("Matplotlib not available, cannot display plots (use --save-plot for SVG output)")
+            return
+        self._draw_panels(plt)
+        plt.show()
+    
+    def _read_new_history(self, offset):
+        """Load complete lines appended after offset and return the new offset"""
+        try:
+            size = self.history_file.stat().st_size
+        except FileNotFoundError:
+            return 0
+        if size < offset:
+            # The file was truncated or replaced; start over from its beginning
+            offset = 0
+        if size == offset:
+            return offset
         
-        plt.tight_layout()
+        try:
+            with open(self.history_file, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Re-read the size: compaction may have truncated the file since the stat
+                size = len(mm)
+                if size < offset:
+                    offset = 0
+                end = mm.rfind(b'\n', offset, size) + 1
+                if end <= offset:
+                    return offset
+                lines = [line for line in mm[offset:end].splitlines() if line.strip()]
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            # mmap refuses empty files: truncated between the stat and the map
+            return 0
         
+        for metrics in _decode_lines(lines):
+            self.metrics_history.append(metrics)
+            self._append_columns(metrics)
+        return end
+    
+    def serve_dashboard(self, refresh=1.0, save_plot=False):
+        """Re-render the plots whenever the monitor appends to the history file"""
         if save_plot:
-            plot_file = self.results_dir / f"performance_plot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            plt.savefig(plot_file, dpi=300, bbox_inches='tight')
-            print(f"Plot saved to: {plot_file}")
+            dashboard_file = self.results_dir / "performance_dashboard.svg"
         else:
-            plt.show()
+            plt = _pyplot()
+            if plt is None:
+                print("Matplotlib not available, cannot serve the dashboard (use --save-plot for SVG output)")
+                return
+            plt.ion()
+        
+        print(f"Watching {self.history_file} (refresh: {refresh}s)")
+        print("Press Ctrl+C to stop")
+        
+        self._stop.clear()
+        previous_handler = signal.signal(signal.SIGINT, lambda *_: self._stop.set())
+        try:
+            offset = self.history_file.stat().st_size if self.history_file.exists() else 0
+            if not save_plot:
+                fig, lines = self._draw_panels(plt)
+            rendered = False
+            while not self._stop.is_set():
+                new_offset = self._read_new_history(offset)
+                if new_offset != offset or not rendered:
+                    offset = new_offset
+                    if save_plot:
+                        self._save_svg(dashboard_file)
+                    else:
+                        self._update_panels(lines)
+                        fig.canvas.draw_idle()
+                    rendered = True
+                
+                if save_plot:
+                    self._stop.wait(refresh)
+                else:
+                    plt.pause(refresh)
+            
+            print("\nDashboard stopped by user")
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
     
     def continuous_monitoring(self, interval=300, quick_tests=True):
         """Run continuous performance monitoring"""
         print(f"Starting continuous monitoring (interval: {interval}s, quick_tests: {quick_tests})")
         print("Press Ctrl+C to stop")
         
+        self._stop.clear()
+        previous_handler = signal.signal(signal.SIGINT, self._request_stop)
         try:
-            while True:
-                print(f"\nRunning performance test at {datetime.now()}")
-                metrics = self.run_performance_test(quick=quick_tests)
+            # Tests run on the main thread; SIGINT interrupts the wait on the
+            # runner and _request_stop terminates it
+            deadline = time.monotonic()
+            while not self._stop.is_set():
+                deadline += interval
+                print(f"\nRunning performance test at {_now_iso()}")
+                metrics = self.run_performance_test(quick_tests)
+                if self._stop.is_set():
+                    break
                 
+                # Everything the tick reports goes out in one write
+                report = io.StringIO()
                 if metrics:
                     self.save_metrics(metrics)
-                    self.print_metrics(metrics)
+                    report.write(self.format_metrics(metrics))
                     
                     if len(self.metrics_history) > 1:
-                        self.generate_trend_analysis()
+                        report.write(self.format_trend_analysis())
                 else:
-                    print("Failed to collect metrics")
+                    report.write("Failed to collect metrics\n")
                 
-                print(f"Waiting {interval} seconds until next test...")
-                time.sleep(interval)
-                
-        except KeyboardInterrupt:
+                # Stay on the start + k * interval grid, skipping ticks
+                # a slow test has already overrun
+                now = time.monotonic()
+                if interval > 0 and deadline < now:
+                    deadline += math.ceil((now - deadline) / interval) * interval
+                delay = max(0.0, deadline - now)
+                report.write(f"Waiting {delay:.0f} seconds until next test...\n")
+                sys.stdout.write(report.getvalue())
+                sys.stdout.flush()
+                self._stop.wait(delay)
+            
             print("\nMonitoring stopped by user")
         except Exception as e:
             print(f"Monitoring error: {e}")
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
 
 def main():
     parser = argparse.ArgumentParser(description="Performance Monitoring Dashboard")
@@ -323,13 +974,19 @@ def main():
                        help="Save plots to file instead of displaying")
     parser.add_argument("--trend", action="store_true",
                        help="Show trend analysis only")
+    parser.add_argument("--serve", action="store_true",
+                       help="Watch the metrics history and re-plot as it grows")
+    parser.add_argument("--refresh", type=float, default=1.0,
+                       help="Dashboard refresh interval in seconds (default: 1.0)")
     
     args = parser.parse_args()
     
-    monitor = PerformanceMonitor(args.results_dir)
+    monitor = PerformanceMonitor(args.results_dir, persistent=args.continuous)
     monitor.load_metrics_history()
     
-    if args.continuous:
+    if args.serve:
+        monitor.serve_dashboard(args.refresh, args.save_plot)
+    elif args.continuous:
         monitor.continuous_monitoring(args.interval, args.quick)
     elif args.plot:
         monitor.plot_metrics(args.save_plot)
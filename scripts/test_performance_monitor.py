@@ -0,0 +1,157 @@
+"""Tests for the on-disk history formats of performance_monitor.py
+
+Run with: python -m pytest scripts/test_performance_monitor.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import performance_monitor as pm
+
+
+def save_samples(monitor, values):
+    """Save one sample per value, using the value as its throughput"""
+    for value in values:
+        metrics = monitor._empty_metrics()
+        metrics['throughput'] = float(value)
+        monitor.save_metrics(metrics)
+
+
+def reload(results_dir):
+    """Return a fresh monitor with the history loaded from results_dir"""
+    monitor = pm.PerformanceMonitor(results_dir)
+    monitor.load_metrics_history()
+    return monitor
+
+
+def throughputs(monitor):
+    return [m['throughput'] for m in monitor.metrics_history]
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    """Shrink the history limits so compaction and wrap-around happen quickly"""
+    monkeypatch.setattr(pm, 'HISTORY_LIMIT', 8)
+    monkeypatch.setattr(pm, 'HISTORY_COMPACT_THRESHOLD', 5)
+    monkeypatch.setattr(pm, 'ARCHIVE_ROW_GROUP_SIZE', 2)
+
+
+def test_reload_keeps_newest_samples(tmp_path, small_limits, monkeypatch):
+    monkeypatch.setattr(pm, 'HAS_PYARROW', False)
+    monkeypatch.setattr(pm, 'HAS_ZSTD', False)
+    monitor = pm.PerformanceMonitor(tmp_path)
+    save_samples(monitor, range(20))
+    monitor.close()
+
+    assert throughputs(reload(tmp_path)) == list(range(12, 20))
+
+
+def test_torn_last_line_is_skipped_and_repaired(tmp_path):
+    monitor = pm.PerformanceMonitor(tmp_path)
+    save_samples(monitor, range(3))
+    monitor.close()
+    with open(monitor.history_file, 'ab') as f:
+        f.write(b'{"timestamp":"2026-')
+
+    monitor = reload(tmp_path)
+    assert throughputs(monitor) == [0, 1, 2]
+
+    # The next sample must not be merged into the torn fragment
+    save_samples(monitor, [3])
+    monitor.close()
+    assert throughputs(reload(tmp_path)) == [0, 1, 2, 3]
+
+
+def test_columns_wrap_at_history_limit(tmp_path, small_limits, monkeypatch):
+    monkeypatch.setattr(pm, 'HAS_PYARROW', False)
+    monkeypatch.setattr(pm, 'HAS_ZSTD', False)
+    monitor = pm.PerformanceMonitor(tmp_path)
+    for count in range(1, 40):
+        save_samples(monitor, [count])
+        columns = monitor._columns()
+        assert len(columns) == len(monitor.metrics_history) == len(monitor._timestamps())
+        assert list(columns[:, pm.COLUMN_INDEX['throughput']]) == throughputs(monitor)
+    # The buffer is recycled instead of growing without bound
+    assert len(monitor._arr) <= 2 * pm.HISTORY_LIMIT
+
+
+def test_parquet_compaction_and_reload(tmp_path, small_limits):
+    pytest.importorskip("pyarrow")
+    monitor = pm.PerformanceMonitor(tmp_path)
+    save_samples(monitor, range(23))
+    monitor.close()
+
+    parts = monitor._archive_parts()
+    assert [p.name for p in parts] == [f"part-{i:06d}.parquet" for i in range(4)]
+    assert monitor.history_file.read_bytes().count(b'\n') == 3
+
+    assert throughputs(reload(tmp_path)) == list(range(15, 23))
+    # Tails spanning several row groups and parts, and more than archived
+    assert [m['throughput'] for m in monitor._load_parquet_tail(7)] == list(range(13, 20))
+    assert [m['throughput'] for m in monitor._load_parquet_tail(50)] == list(range(20))
+
+
+@pytest.fixture
+def zstd_monitor(tmp_path, small_limits, monkeypatch):
+    """A monitor whose history has been compacted into four zstd frames"""
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(pm, 'HAS_PYARROW', False)
+    monitor = pm.PerformanceMonitor(tmp_path)
+    save_samples(monitor, range(23))
+    monitor.close()
+    return monitor
+
+
+def test_zstd_tail_uses_frame_index(zstd_monitor):
+    frames = zstd_monitor.zstd_index_file.read_text().split('\n')[:-1]
+    assert [int(line.split()[1]) for line in frames] == [5, 5, 5, 5]
+    offsets = [int(line.split()[0]) for line in frames]
+
+    # Seven rows need the last two frames only
+    assert zstd_monitor._zstd_tail_offset(7) == offsets[2]
+    assert [m['throughput'] for m in zstd_monitor._load_archive_tail(7)] == list(range(13, 20))
+    assert throughputs(reload(zstd_monitor.results_dir)) == list(range(15, 23))
+
+
+@pytest.mark.parametrize("index", [None, "12 5\n34\n", "not an index\n"])
+def test_zstd_tail_without_usable_index(zstd_monitor, index):
+    if index is None:
+        zstd_monitor.zstd_index_file.unlink()
+    else:
+        zstd_monitor.zstd_index_file.write_text(index)
+
+    assert zstd_monitor._zstd_tail_offset(7) == 0
+    assert [m['throughput'] for m in zstd_monitor._load_archive_tail(7)] == list(range(13, 20))
+
+
+def test_read_new_history_survives_truncation_and_bad_lines(tmp_path):
+    writer = pm.PerformanceMonitor(tmp_path)
+    viewer = pm.PerformanceMonitor(tmp_path)
+    assert viewer._read_new_history(0) == 0
+
+    save_samples(writer, range(2))
+    offset = viewer._read_new_history(0)
+    assert throughputs(viewer) == [0, 1]
+
+    # Only complete lines are consumed; malformed ones are skipped
+    with open(writer.history_file, 'ab') as f:
+        f.write(b'garbage\n{"throughput":')
+    offset = viewer._read_new_history(offset)
+    assert throughputs(viewer) == [0, 1]
+
+    # Truncated by compaction: start over from the beginning of the file
+    writer.close()
+    writer.history_file.write_bytes(b'')
+    assert viewer._read_new_history(offset) == 0
+    save_samples(writer, [2])
+    viewer._read_new_history(0)
+    assert throughputs(viewer) == [0, 1, 2]
+
+    writer.close()
+    writer.history_file.unlink()
+    assert viewer._read_new_history(offset) == 0
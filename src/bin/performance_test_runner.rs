@@ -5,10 +5,14 @@
 //! characteristics of the code block processing system.
 
 use std::collections::HashMap;
+use std::io::{self, BufRead, Write};
 use std::time::{Duration, Instant};
 use std::sync::Arc;
 use std::thread;
 
+use serde::{Deserialize, Serialize};
+use serde_json::json;
+
 use md2docx_converter::markdown::code_block::{
     PerformanceManager, PerformanceConfig,
     CodeBlockCache, CacheConfig,
@@ -141,11 +145,96 @@ impl TestResults {
     }
 }
 
+/// Aggregated metrics consumed by `scripts/performance_monitor.py`
+#[derive(Debug, Clone, Default, Serialize)]
+struct MonitorMetrics {
+    /// Highest throughput of any test (ops/sec)
+    pub throughput: f64,
+    /// Mean of the per-test average latencies (ms)
+    pub latency_avg: f64,
+    /// Mean of the per-test p95 latencies (ms)
+    pub latency_p95: f64,
+    /// Highest memory usage observed by any test (MB)
+    pub memory_usage: f64,
+    /// Mean cache hit ratio of the tests with caching enabled (%)
+    pub cache_hit_ratio: f64,
+    /// Percentage of passing tests
+    pub success_rate: f64,
+    pub tests_passed: usize,
+    pub tests_total: usize,
+}
+
+impl MonitorMetrics {
+    /// Reduce a set of test results to the monitor's summary metrics
+    fn from_results(results: &[TestResults]) -> Self {
+        let tests_total = results.len();
+        if tests_total == 0 {
+            return Self::default();
+        }
+
+        let to_ms = |d: Duration| d.as_secs_f64() * 1000.0;
+        let to_mb = |bytes: usize| bytes as f64 / (1024.0 * 1024.0);
+
+        let tests_passed = results.iter().filter(|r| r.is_passing()).count();
+        let cached: Vec<_> = results.iter().filter(|r| r.config.enable_caching).collect();
+        let cache_hit_ratio = if cached.is_empty() {
+            0.0
+        } else {
+            cached.iter().map(|r| r.cache_stats.hit_ratio).sum::<f64>() / cached.len() as f64 * 100.0
+        };
+
+        Self {
+            throughput: results.iter().map(|r| r.throughput).fold(0.0, f64::max),
+            latency_avg: results.iter().map(|r| to_ms(r.average_latency)).sum::<f64>() / tests_total as f64,
+            latency_p95: results.iter().map(|r| to_ms(r.p95_latency)).sum::<f64>() / tests_total as f64,
+            memory_usage: results
+                .iter()
+                .map(|r| to_mb(r.memory_usage.peak_memory.max(r.memory_usage.final_memory)))
+                .fold(0.0, f64::max),
+            cache_hit_ratio,
+            success_rate: tests_passed as f64 / tests_total as f64 * 100.0,
+            tests_passed,
+            tests_total,
+        }
+    }
+}
+
+/// Marker line separating the human-readable report from the JSON metrics
+const METRICS_SENTINEL: &str = "---METRICS---";
+
+/// Request read from stdin in `--daemon` mode, one JSON object per line
+#[derive(Debug, Deserialize)]
+struct DaemonRequest {
+    /// `run` or `shutdown`
+    #[serde(default = "DaemonRequest::default_cmd")]
+    pub cmd: String,
+    /// Run the reduced test set
+    #[serde(default)]
+    pub quick: bool,
+}
+
+impl DaemonRequest {
+    fn default_cmd() -> String {
+        "run".to_string()
+    }
+}
+
+/// Print suite progress unless the suite is quiet
+macro_rules! progress {
+    ($suite:expr, $($arg:tt)*) => {
+        if !$suite.quiet {
+            println!($($arg)*);
+        }
+    };
+}
+
 /// Performance test suite
 struct PerformanceTestSuite {
     performance_manager: Arc<PerformanceManager>,
     memory_profiler: Arc<MemoryProfiler>,
     optimizer: Arc<PerformanceOptimizer>,
+    /// Suppress progress output (stdout carries the protocol in daemon mode)
+    quiet: bool,
 }
 
 impl PerformanceTestSuite {
@@ -184,14 +273,21 @@ impl PerformanceTestSuite {
             performance_manager,
             memory_profiler,
             optimizer,
+            quiet: false,
         }
     }
 
+    /// Disable progress output
+    fn quiet(mut self) -> Self {
+        self.quiet = true;
+        self
+    }
+
     /// Run all performance tests
     fn run_all_tests(&self) -> Vec<TestResults> {
         let mut results = Vec::new();
 
-        println!("Starting comprehensive performance test suite...\n");
+        progress!(self, "Starting comprehensive performance test suite...\n");
 
         // Test 1: Baseline performance
         results.push(self.run_baseline_test());
@@ -217,9 +313,29 @@ impl PerformanceTestSuite {
         results
     }
 
+    /// Run a reduced test set for fast feedback
+    fn run_quick_tests(&self) -> Vec<TestResults> {
+        progress!(self, "Starting quick performance test suite...\n");
+
+        let config = TestConfig {
+            code_block_count: 200,
+            code_size: CodeSize::Medium,
+            thread_count: 1,
+            test_duration: Duration::from_secs(10),
+            enable_caching: true,
+            enable_memory_profiling: true,
+            enable_optimization: false,
+        };
+
+        vec![
+            self.run_single_test("quick_baseline", config.clone()),
+            self.run_single_test("quick_concurrent_4_threads", TestConfig { thread_count: 4, ..config }),
+        ]
+    }
+
     /// Run baseline performance test
     fn run_baseline_test(&self) -> TestResults {
-        println!("Running baseline performance test...");
+        progress!(self, "Running baseline performance test...");
         
         let config = TestConfig {
             code_block_count: 1000,
@@ -236,7 +352,7 @@ impl PerformanceTestSuite {
 
     /// Run scalability tests with different loads
     fn run_scalability_tests(&self) -> Vec<TestResults> {
-        println!("Running scalability tests...");
+        progress!(self, "Running scalability tests...");
         
         let mut results = Vec::new();
         let counts = vec![100, 500, 1000, 5000, 10000];
@@ -261,7 +377,7 @@ impl PerformanceTestSuite {
 
     /// Run memory stress tests
     fn run_memory_stress_tests(&self) -> Vec<TestResults> {
-        println!("Running memory stress tests...");
+        progress!(self, "Running memory stress tests...");
         
         let mut results = Vec::new();
         let sizes = vec![CodeSize::Small, CodeSize::Medium, CodeSize::Large, CodeSize::Huge];
@@ -286,7 +402,7 @@ impl PerformanceTestSuite {
 
     /// Run cache performance tests
     fn run_cache_performance_tests(&self) -> Vec<TestResults> {
-        println!("Running cache performance tests...");
+        progress!(self, "Running cache performance tests...");
         
         let mut results = Vec::new();
 
@@ -316,7 +432,7 @@ impl PerformanceTestSuite {
 
     /// Run concurrent processing tests
     fn run_concurrent_tests(&self) -> Vec<TestResults> {
-        println!("Running concurrent processing tests...");
+        progress!(self, "Running concurrent processing tests...");
         
         let mut results = Vec::new();
         let thread_counts = vec![1, 2, 4, 8, 16];
@@ -341,7 +457,7 @@ impl PerformanceTestSuite {
 
     /// Run long-running stability test
     fn run_stability_test(&self) -> TestResults {
-        println!("Running stability test...");
+        progress!(self, "Running stability test...");
         
         let config = TestConfig {
             code_block_count: 10000,
@@ -358,7 +474,7 @@ impl PerformanceTestSuite {
 
     /// Run optimization effectiveness test
     fn run_optimization_test(&self) -> TestResults {
-        println!("Running optimization effectiveness test...");
+        progress!(self, "Running optimization effectiveness test...");
         
         let config = TestConfig {
             code_block_count: 5000,
@@ -375,7 +491,7 @@ impl PerformanceTestSuite {
 
     /// Run a single performance test
     fn run_single_test(&self, test_name: &str, config: TestConfig) -> TestResults {
-        println!("  Running test: {}", test_name);
+        progress!(self, "  Running test: {}", test_name);
 
         // Start memory profiling if enabled
         if config.enable_memory_profiling {
@@ -720,13 +836,70 @@ impl DataProcessor_{}_{} {{
     }
 }
 
+/// Serve test runs over stdin/stdout until stdin closes
+///
+/// Each request line (`{"cmd":"run","quick":true}`) is answered with one
+/// line, either `{"metrics":{...}}` or `{"error":"..."}`. Every run uses a
+/// fresh suite so results match those of a one-shot invocation.
+fn run_daemon() {
+    let stdin = io::stdin();
+    let mut stdout = io::stdout();
+
+    for line in stdin.lock().lines() {
+        let line = match line {
+            Ok(line) => line,
+            Err(_) => break,
+        };
+        if line.trim().is_empty() {
+            continue;
+        }
+
+        let response = match serde_json::from_str::<DaemonRequest>(&line) {
+            Ok(request) if request.cmd == "run" => {
+                let suite = PerformanceTestSuite::new().quiet();
+                let results = if request.quick {
+                    suite.run_quick_tests()
+                } else {
+                    suite.run_all_tests()
+                };
+                json!({ "metrics": MonitorMetrics::from_results(&results) })
+            }
+            Ok(request) if request.cmd == "shutdown" => break,
+            Ok(request) => json!({ "error": format!("unknown command: {}", request.cmd) }),
+            Err(e) => json!({ "error": format!("invalid request: {}", e) }),
+        };
+
+        if writeln!(stdout, "{}", response).and_then(|_| stdout.flush()).is_err() {
+            break;
+        }
+    }
+}
+
 /// Main function to run performance tests
+///
+/// Flags:
+/// - `--quick-test`: run the reduced test set
+/// - `--emit-json`: append the aggregated metrics as JSON after a
+///   `---METRICS---` line so callers don't need to scrape the report
+/// - `--daemon`: stay resident and serve runs requested on stdin
 fn main() {
+    let args: Vec<String> = std::env::args().skip(1).collect();
+    if args.iter().any(|arg| arg == "--daemon") {
+        run_daemon();
+        return;
+    }
+    let quick = args.iter().any(|arg| arg == "--quick-test");
+    let emit_json = args.iter().any(|arg| arg == "--emit-json");
+
     println!("Code Block Processing Performance Test Suite");
     println!("============================================\n");
 
     let test_suite = PerformanceTestSuite::new();
-    let results = test_suite.run_all_tests();
+    let results = if quick {
+        test_suite.run_quick_tests()
+    } else {
+        test_suite.run_all_tests()
+    };
 
     println!("\n\nPerformance Test Results Summary");
     println!("================================\n");
@@ -761,12 +934,126 @@ fn main() {
         println!("  {}: {:.1}", test_name, throughput);
     }
 
-    // Exit with appropriate code
     if passing_tests == total_tests {
         println!("\n✅ All performance tests passed!");
-        std::process::exit(0);
     } else {
         println!("\n❌ Some performance tests failed!");
-        std::process::exit(1);
     }
-}
\ No newline at end of file
+
+    // The metrics block must stay last so it can be split off the report
+    if emit_json {
+        let metrics = MonitorMetrics::from_results(&results);
+        println!("\n{}", METRICS_SENTINEL);
+        println!("{}", serde_json::to_string(&metrics).expect("metrics are serializable"));
+    }
+
+    // Exit with appropriate code
+    std::process::exit(if passing_tests == total_tests { 0 } else { 1 });
+}
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    const MB: usize = 1024 * 1024;
+
+    fn create_test_result(name: &str, passing: bool, enable_caching: bool) -> TestResults {
+        TestResults {
+            test_name: name.to_string(),
+            config: TestConfig {
+                enable_caching,
+                ..TestConfig::default()
+            },
+            duration: Duration::from_secs(1),
+            total_operations: 100,
+            successful_operations: if passing { 100 } else { 50 },
+            throughput: 100.0,
+            average_latency: Duration::from_millis(10),
+            p95_latency: Duration::from_millis(20),
+            p99_latency: Duration::from_millis(30),
+            memory_usage: MemoryUsageStats::default(),
+            cache_stats: CacheStats::default(),
+            error_count: 0,
+            errors: Vec::new(),
+        }
+    }
+
+    fn assert_close(actual: f64, expected: f64) {
+        assert!((actual - expected).abs() < 1e-9, "expected {}, got {}", expected, actual);
+    }
+
+    #[test]
+    fn test_monitor_metrics_mixed_results() {
+        let mut fast = create_test_result("fast", true, true);
+        fast.throughput = 500.0;
+        fast.memory_usage.peak_memory = 8 * MB;
+        fast.memory_usage.final_memory = 4 * MB;
+        fast.cache_stats.hit_ratio = 0.9;
+
+        let mut slow = create_test_result("slow", false, true);
+        slow.throughput = 50.0;
+        slow.average_latency = Duration::from_millis(30);
+        slow.p95_latency = Duration::from_millis(60);
+        slow.memory_usage.peak_memory = 2 * MB;
+        slow.memory_usage.final_memory = 16 * MB;
+        slow.cache_stats.hit_ratio = 0.5;
+
+        let mut uncached = create_test_result("uncached", true, false);
+        uncached.cache_stats.hit_ratio = 0.0;
+
+        let metrics = MonitorMetrics::from_results(&[fast, slow, uncached]);
+
+        // Peaks for throughput and memory, means for latencies
+        assert_close(metrics.throughput, 500.0);
+        assert_close(metrics.memory_usage, 16.0);
+        assert_close(metrics.latency_avg, (10.0 + 30.0 + 10.0) / 3.0);
+        assert_close(metrics.latency_p95, (20.0 + 60.0 + 20.0) / 3.0);
+        // Only tests with caching enabled count towards the hit ratio
+        assert_close(metrics.cache_hit_ratio, 70.0);
+        assert_eq!(metrics.tests_passed, 2);
+        assert_eq!(metrics.tests_total, 3);
+        assert_close(metrics.success_rate, 200.0 / 3.0);
+    }
+
+    #[test]
+    fn test_monitor_metrics_without_cached_tests() {
+        let results = vec![
+            create_test_result("a", true, false),
+            create_test_result("b", true, false),
+        ];
+        let metrics = MonitorMetrics::from_results(&results);
+
+        assert_close(metrics.cache_hit_ratio, 0.0);
+        assert_eq!(metrics.tests_passed, 2);
+        assert_close(metrics.success_rate, 100.0);
+    }
+
+    #[test]
+    fn test_monitor_metrics_empty_results() {
+        let metrics = MonitorMetrics::from_results(&[]);
+
+        assert_eq!(metrics.tests_total, 0);
+        assert_eq!(metrics.tests_passed, 0);
+        assert_close(metrics.success_rate, 0.0);
+        assert_close(metrics.throughput, 0.0);
+        assert_close(metrics.latency_avg, 0.0);
+    }
+
+    #[test]
+    fn test_daemon_request_parsing() {
+        let request: DaemonRequest = serde_json::from_str(r#"{"cmd":"run","quick":true}"#).unwrap();
+        assert_eq!(request.cmd, "run");
+        assert!(request.quick);
+
+        let request: DaemonRequest = serde_json::from_str(r#"{"cmd":"shutdown"}"#).unwrap();
+        assert_eq!(request.cmd, "shutdown");
+        assert!(!request.quick);
+
+        // Both fields are optional: an empty object is a full run
+        let request: DaemonRequest = serde_json::from_str("{}").unwrap();
+        assert_eq!(request.cmd, "run");
+        assert!(!request.quick);
+
+        assert!(serde_json::from_str::<DaemonRequest>("not json").is_err());
+        assert!(serde_json::from_str::<DaemonRequest>(r#"{"quick":"yes"}"#).is_err());
+    }
+}